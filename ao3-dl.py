@@ -5,9 +5,13 @@ import json
 import re
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Optional, Union, Any
+from datetime import date, datetime
+from typing import Iterator, Optional, Union, Any
 
 from bs4 import BeautifulSoup, Tag
 from weasyprint import HTML # type: ignore
@@ -15,8 +19,10 @@ import ebookmeta # type: ignore
 from ebooklib import epub # type: ignore
 import fitz # type: ignore
 
-from models import Series, Work, User
+from models import Blurb, Filter, Series, Work, User
 from helpers import NavStr
+from jobs import JobQueue, Job, Heartbeat, LEASE_SECONDS, CLAIMED, PENDING
+from archive import Archive, Entry
 import helpers
 
 LOCAL_DIR: Path = Path(__file__).resolve().parent
@@ -28,6 +34,45 @@ class Options:
 	epub: Optional[bool]
 	html: Optional[bool]
 	cookies: Optional[str]
+	stream: bool = False
+	min_words: Optional[int] = None
+	fandom: Optional[list[str]] = None
+	updated_since: Optional[datetime] = None
+	complete_only: bool = False
+	rating: Optional[list[str]] = None
+	dry_run: bool = False
+	archive: Optional[str] = None
+
+@dataclass
+class EnqueueOptions:
+	queue: str
+	urls: list[str]
+	min_words: Optional[int] = None
+	fandom: Optional[list[str]] = None
+	updated_since: Optional[datetime] = None
+	complete_only: bool = False
+	rating: Optional[list[str]] = None
+
+@dataclass
+class WorkerOptions:
+	queue: str
+	pdf: Optional[bool]
+	epub: Optional[bool]
+	html: Optional[bool]
+	cookies: Optional[str]
+	stream: bool = False
+	lease: int = LEASE_SECONDS
+	poll: int = 30
+	archive: Optional[str] = None
+
+@dataclass
+class RenderOptions:
+	archive: str
+	pdf: Optional[bool]
+	epub: Optional[bool]
+	html: Optional[bool]
+	jobs: Optional[int] = None
+	output: Optional[str] = None
 
 def _get_thumbnail(directory: str, file_name: str) -> str:
 	pdf_path: str = f"{directory}/{file_name}.pdf"
@@ -38,16 +83,20 @@ def _get_thumbnail(directory: str, file_name: str) -> str:
 
 	# Save the page as a thumbnail image
 	pix = page.get_pixmap(dpi=100)
-	thumbnail_path = f"{directory}/thumbnail.jpg"
+	# Named after the work, since works from one series are rendered into the same directory, possibly at once
+	thumbnail_path = f"{directory}/{file_name}.thumbnail.jpg"
 	pix.save(thumbnail_path)
 
 	return thumbnail_path
 
-def _prep_for_print(content: NavStr, soup: BeautifulSoup, work: Work, cover_data: str) -> str:
-	chapters: NavStr = soup.find("div", id="chapters")
+# Works don't keep the chapters in `content`, they are rebuilt from the chapter list
+def _get_chapters(work: Work) -> Optional[str]:
+	if work.is_single_chapter:
+		return work.chapter_list[0].content if len(work.chapter_list) > 0 else None
+	return f'<div id="chapters">{"".join(chapter.content for chapter in work.chapter_list)}</div>'
 
-	new_content: Optional[str] = chapters.prettify() if isinstance(chapters, Tag) else None
-	new_content = helpers.append(
+def _prep_for_print(content: Union[NavStr, str], work: Work, cover_data: str) -> str:
+	new_content: Optional[str] = helpers.append(
 		content,
 		cover_data
 	)
@@ -123,10 +172,10 @@ def ao3_dl(work: Work, args: Options, series: Optional[Series]) -> None:
 	# Printing
 
 	# Always start by printing a pdf to get a thumbnail for the epub
-	print_pdf(soup, work, cover_info, directory, file_name)
+	print_pdf(work, cover_info, directory, file_name)
 
 	if args.html:
-		print_html(soup, work, cover_info, directory, file_name)
+		print_html(work, cover_info, directory, file_name)
 	if args.epub:
 		thumbnail = _get_thumbnail(directory, file_name)
 		# Print the epub
@@ -137,13 +186,13 @@ def ao3_dl(work: Work, args: Options, series: Optional[Series]) -> None:
 		# Delete the pdf if it's not wanted
 		os.remove(f"{directory}/{file_name}.pdf")
 
-def print_pdf(soup: BeautifulSoup, work: Work, cover_data: str, out_dir: str, out_file: str) -> None:
-	content: str = _prep_for_print(soup.find("div", id="chapters"), soup, work, cover_data)
+def print_pdf(work: Work, cover_data: str, out_dir: str, out_file: str) -> None:
+	content: str = _prep_for_print(_get_chapters(work), work, cover_data)
 	result_file = open(f"{out_dir}/{out_file}.pdf", "w+b")
 	HTML(string=content).write_pdf(result_file, stylesheets=[f"{Path(__file__).resolve().parent}/style.css"])
 
-def print_html(soup: BeautifulSoup, work: Work, cover_data: str, out_dir: str, out_file: str) -> None:
-	content: str = _prep_for_print(soup.find("div", id="chapters"), soup, work, cover_data)
+def print_html(work: Work, cover_data: str, out_dir: str, out_file: str) -> None:
+	content: str = _prep_for_print(_get_chapters(work), work, cover_data)
 	with open(f"{out_dir}/{out_file}.html", "w", encoding="utf-8") as file:
 		file.write(content)
 
@@ -218,22 +267,25 @@ def print_epub(cover_data: str, work: Work, series: Optional[Series], out_dir: s
 
 	ebookmeta.set_metadata(epub_title, meta)
 
-def _parse_works(url: str, cookies: Optional[dict[str, Any]]) -> Optional[Union[Work, Series, User]]:
+def _is_work_link(url: str) -> bool:
+	return "works/" in url or url.isdigit()
+
+def _parse_works(url: str, cookies: Optional[dict[str, Any]], stream: bool = False, filters: Optional[Filter] = None, archive: Optional[Archive] = None) -> Optional[Union[Work, Series, User]]:
 	content_id: Optional[int] = helpers.extract_int(url)
 	if url.isdigit():
 		content_id = int(url)
 
-	if "works/" in url or url.isdigit():
+	if _is_work_link(url):
 		if content_id is None:
 			return None
-		return Work(content_id, cookies=cookies)
+		return Work(content_id, cookies=cookies, stream=stream, archive=archive)
 	if "series/" in url:
 		if content_id is None:
 			return None
-		return Series(content_id)
+		return Series(content_id, stream=stream, filters=filters, archive=archive)
 	if "users/" in url:
 		username: str = url.split("/")[1]
-		return User(username)
+		return User(username, stream=stream, filters=filters, archive=archive)
 
 	return None
 
@@ -263,16 +315,57 @@ def _parse_cookies(cookie_file: str) -> dict[str, str]:
 				cookies[line_fields[5]] = line_fields[6]
 	return cookies
 
+def _load_config() -> Optional[dict[str, Any]]:
+	if not os.path.exists(f"{LOCAL_DIR}/config.json"):
+		return None
+	with open(f"{LOCAL_DIR}/config.json", "r", encoding="utf-8") as file:
+		config: dict[str, Any] = json.load(file)
+		return config
+
+def _ensure_output_formats(args: Options) -> None:
+	config: Optional[dict[str, Any]] = _load_config()
+	# Try to get default formats if none are given and the config is defined
+	if not _has_output_formats(args) and config is not None:
+		print("No output formats given, using defaults:")
+		args.pdf = config["default_formats"]["pdf"]
+		args.html = config["default_formats"]["html"]
+		args.epub = config["default_formats"]["epub"]
+		print(f'\t{"--pdf " if args.pdf else ""}{"--html " if args.html else ""}{"--epub" if args.epub else ""}')
+	# If there are still no output formats, error out
+	if not _has_output_formats(args):
+		print("Select at least 1 output format: --pdf --epub --html")
+		sys.exit(1)
+
+def _get_filter(args: Union[Options, EnqueueOptions]) -> Optional[Filter]:
+	if args.min_words is None and args.fandom is None and args.updated_since is None and not args.complete_only and args.rating is None:
+		return None
+	return Filter(
+		min_words=args.min_words,
+		fandoms=args.fandom,
+		updated_since=args.updated_since,
+		complete_only=args.complete_only,
+		ratings=args.rating
+	)
+
+def _format_bytes(size: float) -> str:
+	for unit in ["B", "KB", "MB", "GB"]:
+		if size < 1024:
+			return f"{size:.1f} {unit}"
+		size /= 1024
+	return f"{size:.1f} TB"
+
+def _print_estimate(blurbs: list[Blurb]) -> None:
+	for blurb in blurbs:
+		print(f"\t{blurb.title} by {blurb.author} ({blurb.words} words, {blurb.chapters} chapters)")
+	print(f"{len(blurbs)} works")
+	print(f"Estimated download: {_format_bytes(sum(x.estimated_bytes() for x in blurbs))}")
+	print(f"Estimated pages: {sum(x.estimated_pages() for x in blurbs)}")
+
 def main(args: Options) -> None:
 	cookies: Optional[dict[str, str]] = None
 	if args.cookies is not None:
 		cookies = _parse_cookies(args.cookies)
 
-	config: Optional[dict[str, Any]] = None
-	if os.path.exists(f"{LOCAL_DIR}/config.json"):
-		with open(f"{LOCAL_DIR}/config.json", "r", encoding="utf-8") as file:
-			config = json.load(file)
-
 	if args.url is None:
 		print("No work given")
 		sys.exit(1)
@@ -283,20 +376,28 @@ def main(args: Options) -> None:
 		print(f"Invalid link: {args.url}")
 		sys.exit(1)
 
-	# Try to get default formats if none are given and the config is defined
-	if not _has_output_formats(args) and config is not None:
-		print("No output formats given, using defaults:")
-		args.pdf = config["default_formats"]["pdf"]
-		args.html = config["default_formats"]["html"]
-		args.epub = config["default_formats"]["epub"]
-		print(f'\t{"--pdf " if args.pdf else ""}{"--html " if args.html else ""}{"--epub" if args.epub else ""}')
-	# If there are still no output formats, error out
-	if not _has_output_formats(args):
-		print("Select at least 1 output format: --pdf --epub --html")
+	# Filters and estimates come from listing pages, a single work would have to be downloaded first
+	if _is_work_link(match.group(0)) and (args.dry_run or _get_filter(args) is not None):
+		print("--dry-run and the filter options only apply to series and users, not single works")
 		sys.exit(1)
 
-	result: Optional[Union[Series | Work | User]] = _parse_works(match.group(0), cookies)
-	if result is not None:
+	# Archived works are rendered later with the render command
+	archive: Optional[Archive] = Archive(args.archive) if args.archive is not None else None
+	if not args.dry_run and archive is None:
+		_ensure_output_formats(args)
+
+	result: Optional[Union[Series | Work | User]] = _parse_works(match.group(0), cookies, args.stream, _get_filter(args), archive)
+	if isinstance(result, (Series, User)) and args.dry_run:
+		_print_estimate(result.blurbs)
+	elif result is not None and archive is not None:
+		works: Iterator[Work] = iter([result]) if isinstance(result, Work) else result.works
+		for archived in works:
+			if archived.restricted:
+				print(f"Error: {archived.id} is restricted, you'll need to pass in a cookies file with the correct authorization using --cookies.")
+				continue
+			print(f"""Archived '{archived.title}'""")
+		print("Finished")
+	elif result is not None:
 		if isinstance(result, Series):
 			series: Series = result
 			print(f"""Downloading '{series.title}'""")
@@ -316,15 +417,232 @@ def main(args: Options) -> None:
 		print(f"[ERROR] No content found at {args.url}")
 
 
+def enqueue(args: EnqueueOptions) -> None:
+	"""
+	Expands each url into one job per work and adds them to the queue.
+	Series and user pages are only read for their listings, no works are fetched.
+	"""
+	queue: JobQueue = JobQueue(args.queue)
+	filters: Optional[Filter] = _get_filter(args)
+	added: int = 0
+
+	for url in args.urls:
+		match: Optional[re.Match[str]] = re.search(helpers.MATCH_REGEX, url)
+		if match is None:
+			print(f"Invalid link: {url}")
+			continue
+		link: str = match.group(0)
+		content_id: Optional[int] = int(link) if link.isdigit() else helpers.extract_int(link)
+
+		if _is_work_link(link):
+			if filters is not None:
+				print(f"[WARNING] Filters only apply to series and users, queuing {link} anyway")
+			if content_id is not None:
+				added += queue.add(content_id)
+		elif "series/" in link:
+			if content_id is not None:
+				series: Series = Series(content_id, filters=filters)
+				for blurb in series.blurbs:
+					added += queue.add(blurb.id, series.id)
+		elif "users/" in link:
+			user: User = User(link.split("/")[1], filters=filters)
+			for blurb in user.blurbs:
+				added += queue.add(blurb.id)
+
+	counts: dict[str, int] = queue.counts()
+	print(f"Added {added} jobs, {counts[PENDING]} pending")
+	queue.close()
+
+def _run_job(job: Job, args: Options, series_cache: dict[int, Series], cookies: Optional[dict[str, str]], archive: Optional[Archive]) -> None:
+	series: Optional[Series] = None
+	if job.series_id is not None:
+		if job.series_id not in series_cache:
+			series_cache[job.series_id] = Series(job.series_id)
+		series = series_cache[job.series_id]
+
+	work: Work = Work(job.work_id, series, cookies=cookies, stream=args.stream, archive=archive)
+	if work.restricted:
+		raise PermissionError(f"{job.work_id} is restricted, pass in a cookies file with the correct authorization using --cookies.")
+	if archive is not None:
+		print(f"""Archived '{work.title}'""")
+		return
+
+	print(f"""Downloading '{work.title}'""")
+	ao3_dl(work=work, series=series, args=args)
+
+def worker(args: WorkerOptions) -> None:
+	"""
+	Claims jobs from the queue until it's empty, fetching and rendering (or archiving) each one.
+	Keeps waiting while other workers still hold jobs, in case their leases run out.
+	"""
+	options: Options = Options(url=args.queue, pdf=args.pdf, epub=args.epub, html=args.html, cookies=args.cookies, stream=args.stream)
+	archive: Optional[Archive] = Archive(args.archive) if args.archive is not None else None
+	if archive is None:
+		_ensure_output_formats(options)
+
+	cookies: Optional[dict[str, str]] = None
+	if args.cookies is not None:
+		cookies = _parse_cookies(args.cookies)
+
+	queue: JobQueue = JobQueue(args.queue)
+	series_cache: dict[int, Series] = {}
+	print(f"[INFO] Worker {queue.worker} started")
+
+	while True:
+		job: Optional[Job] = queue.claim(args.lease)
+		if job is None:
+			if queue.counts()[CLAIMED] == 0:
+				break
+			time.sleep(args.poll)
+			continue
+
+		try:
+			# Renders can outlast a lease, keep it alive for as long as the job runs
+			with Heartbeat(queue, job, args.lease):
+				_run_job(job, options, series_cache, cookies, archive)
+			if not queue.complete(job):
+				print(f"[WARNING] Work {job.work_id} finished after its lease was lost, the result wasn't recorded")
+		# Restricted works and pages that can't be parsed will fail the same way every time
+		except (PermissionError, LookupError) as ex:
+			print(f"Error: {ex}")
+			if not queue.fail(job, str(ex) or type(ex).__name__, retry=False):
+				print(f"[WARNING] Work {job.work_id} failed after its lease was lost, the result wasn't recorded")
+		# Work exits when it gives up on a download, that shouldn't take the worker down with it
+		except (Exception, SystemExit) as ex: # pylint: disable=broad-exception-caught
+			print(f"Error: {ex}")
+			traceback.print_exc()
+			if not queue.fail(job, str(ex) or type(ex).__name__):
+				print(f"[WARNING] Work {job.work_id} failed after its lease was lost, the result wasn't recorded")
+
+	counts: dict[str, int] = queue.counts()
+	print(f"Finished: {counts['done']} done, {counts['failed']} failed")
+	queue.close()
+
+def _render_entry(path: str, entry: Entry, args: Options) -> Optional[str]:
+	"""
+	Renders a single archived work. Runs in a separate process.
+	Returns:
+		Optional[str]: A description of the error, if rendering failed.
+	"""
+	try:
+		metadata: dict[str, Any] = entry.metadata
+		series: Optional[Series] = None
+		if metadata["series"] is not None:
+			series = Series.offline(metadata["series"]["id"], metadata["series"]["title"], metadata["series"]["length"])
+		series_lengths: dict[int, int] = {int(key): value for key, value in metadata["series_lengths"].items()}
+
+		work: Work = Work.from_page(metadata["id"], Archive(path).read(entry), series_lengths, series)
+		print(f"""Rendering '{work.title}'""")
+		ao3_dl(work=work, series=series, args=args)
+		return None
+	except Exception as ex: # pylint: disable=broad-exception-caught
+		traceback.print_exc()
+		return f"{entry.metadata['id']}: {ex}"
+
+def render(args: RenderOptions) -> None:
+	"""
+	Renders every work in an archive, several at a time. Nothing is downloaded.
+	"""
+	options: Options = Options(url=args.archive, pdf=args.pdf, epub=args.epub, html=args.html, cookies=None)
+	_ensure_output_formats(options)
+
+	archive: Archive = Archive(os.path.abspath(args.archive))
+	entries: list[Entry] = archive.entries()
+	if len(entries) == 0:
+		print(f"[ERROR] No works found in {args.archive}")
+		sys.exit(1)
+
+	if args.output is not None:
+		os.makedirs(args.output, exist_ok=True)
+		os.chdir(args.output)
+
+	print(f"Rendering {len(entries)} works")
+	with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+		errors: list[str] = [x for x in pool.map(_render_entry, repeat(archive.path), entries, repeat(options)) if x is not None]
+
+	print(f"Finished: {len(entries) - len(errors)} rendered, {len(errors)} failed")
+	for error in errors:
+		print(f"\t{error}")
+
+def status(queue_path: str) -> None:
+	queue: JobQueue = JobQueue(queue_path)
+	for state, count in queue.counts().items():
+		print(f"{state}: {count}")
+	for work_id, error in queue.failures():
+		print(f"\t{work_id}: {error}")
+	queue.close()
+
+def _parse_date(value: str) -> datetime:
+	"""
+	Only plain dates are accepted, listing dates carry no time or timezone to compare against.
+	"""
+	try:
+		return datetime.combine(date.fromisoformat(value), datetime.min.time())
+	except ValueError as e:
+		raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD") from e
+
+def _add_format_arguments(arg_parser: argparse.ArgumentParser) -> None:
+	arg_parser.add_argument('--pdf', action='store_true', help='Will export the parsed work as a pdf.')
+	arg_parser.add_argument('--epub', action='store_true', help='Will export the parsed work as an epub.')
+	arg_parser.add_argument('--html', action='store_true', help='Will export the parsed work as raw html.')
+
+def _add_fetch_arguments(arg_parser: argparse.ArgumentParser) -> None:
+	arg_parser.add_argument('--cookies', type=str, help="File containing browser cookies - used to access restricted content.", required=False)
+	arg_parser.add_argument('--stream', action='store_true', help="Streams each work to a temporary file and parses it one chapter at a time. Lowers memory use on very large works.")
+	arg_parser.add_argument('--archive', type=str, help="Store the downloaded pages in this archive file instead of rendering them. Render them later with 'ao3-dl.py render'.", required=False)
+
+def _add_filter_arguments(arg_parser: argparse.ArgumentParser) -> None:
+	arg_parser.add_argument('--min-words', type=int, help="Skip works in a series or user listing with fewer words than this.", required=False)
+	arg_parser.add_argument('--fandom', type=str, action='append', help="Only download works in a series or user listing tagged with this fandom. Can be given more than once.", required=False)
+	arg_parser.add_argument('--updated-since', type=_parse_date, help="Skip works in a series or user listing not updated since this date (YYYY-MM-DD).", required=False)
+	arg_parser.add_argument('--complete-only', action='store_true', help="Skip works in a series or user listing that are still in progress.")
+	arg_parser.add_argument('--rating', type=str, action='append', help="Only download works in a series or user listing with this rating, e.g. 'Teen'. Can be given more than once.", required=False)
+
+def _command(argv: list[str]) -> None:
+	command: str = argv[0]
+	arg_parser: argparse.ArgumentParser = argparse.ArgumentParser(prog=f"ao3-dl.py {command}")
+
+	if command == "render":
+		arg_parser.description = "Renders every work in an archive without downloading anything."
+		arg_parser.add_argument('archive', type=str, help='Archive created with --archive.')
+		_add_format_arguments(arg_parser)
+		arg_parser.add_argument('--jobs', type=int, help="Number of works to render at once. Defaults to the number of CPUs.", required=False)
+		arg_parser.add_argument('--output', type=str, help="Directory to render into. Defaults to the current directory.", required=False)
+		render(RenderOptions(**vars(arg_parser.parse_args(argv[1:]))))
+		return
+
+	arg_parser.add_argument('queue', type=str, help='SQLite file holding the job queue. Create it on storage shared by all workers.')
+
+	if command == "enqueue":
+		arg_parser.description = "Adds one job per work to the queue for every given work, series or user."
+		arg_parser.add_argument('urls', type=str, nargs='+', help='Works, series or users to download.')
+		_add_filter_arguments(arg_parser)
+		enqueue(EnqueueOptions(**vars(arg_parser.parse_args(argv[1:]))))
+	elif command == "worker":
+		arg_parser.description = "Downloads jobs from the queue until it's empty. Run as many as needed."
+		_add_format_arguments(arg_parser)
+		_add_fetch_arguments(arg_parser)
+		arg_parser.add_argument('--lease', type=int, default=LEASE_SECONDS, help="Seconds before a claimed job is given to another worker.")
+		arg_parser.add_argument('--poll', type=int, default=30, help="Seconds to wait before checking again while other workers are busy.")
+		worker(WorkerOptions(**vars(arg_parser.parse_args(argv[1:]))))
+	elif command == "status":
+		arg_parser.description = "Shows how many jobs are in each state and why any failed."
+		status(arg_parser.parse_args(argv[1:]).queue)
+
+COMMANDS: list[str] = ["enqueue", "worker", "status", "render"]
+
 if __name__ == "__main__":
+	if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+		_command(sys.argv[1:])
+		sys.exit(0)
+
 	parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Utility for downloading a work or series from archiveofourown.org.')
 
 	parser.add_argument('url', type=str, help='The URL of the work or series to download. Also accepts an ID and parses it as a work.')
 
-	parser.add_argument('--pdf', action='store_true', help='Will export the parsed work as a pdf.')
-	parser.add_argument('--epub', action='store_true', help='Will export the parsed work as an epub.')
-	parser.add_argument('--html', action='store_true', help='Will export the parsed work as raw html.')
-
-	parser.add_argument('--cookies', type=str, help="File containing browser cookies - used to access restricted content.", required=False)
+	_add_format_arguments(parser)
+	_add_fetch_arguments(parser)
+	_add_filter_arguments(parser)
+	parser.add_argument('--dry-run', action='store_true', help="List the works in a series or user listing that would be downloaded with an estimate of their size, without downloading them.")
 
 	main(Options(**vars(parser.parse_args())))
@@ -0,0 +1,116 @@
+
+import json
+import os
+import struct
+import zlib
+from typing import IO, Any, Iterator, Optional
+
+from streaming import CHUNK_SIZE
+
+try:
+	import fcntl
+except ImportError: # Windows
+	fcntl = None # type: ignore
+
+MAGIC: bytes = b"AO3A"
+# Magic, length of the metadata, length of the compressed page
+HEADER: struct.Struct = struct.Struct(">4sII")
+COMPRESSION_LEVEL: int = 9
+
+class Entry:
+	"""
+	A work stored in an archive. Only the metadata is read up front, the page is loaded on request.
+	"""
+	__slots__ = ("offset", "metadata")
+
+	offset: int
+	metadata: dict[str, Any]
+
+	def __init__(self, offset: int, metadata: dict[str, Any]):
+		self.offset = offset
+		self.metadata = metadata
+
+	def key(self) -> tuple[int, Optional[int]]:
+		series: Optional[dict[str, Any]] = self.metadata.get("series")
+		return (self.metadata["id"], series["id"] if series is not None else None)
+
+class Archive:
+	"""
+	Append-only bundle of raw work pages and their metadata, so works can be rendered again without
+	being downloaded again.
+
+	Each record is a header, the metadata as JSON and the zlib compressed page. Records are never rewritten;
+	archiving a work again appends a new record, and the latest one for a work is used.
+	"""
+	path: str
+
+	def __init__(self, path: str):
+		self.path = path
+
+	def add(self, metadata: dict[str, Any], page: IO[bytes]) -> None:
+		"""
+		Appends a work. The page is compressed one chunk at a time.
+		"""
+		compressor = zlib.compressobj(COMPRESSION_LEVEL)
+		body: list[bytes] = []
+		while chunk := page.read(CHUNK_SIZE):
+			body.append(compressor.compress(chunk))
+		body.append(compressor.flush())
+
+		meta: bytes = json.dumps(metadata).encode("utf-8")
+		data: bytes = b"".join(body)
+		record: bytes = HEADER.pack(MAGIC, len(meta), len(data)) + meta + data
+
+		# Several workers, possibly on different machines, can append to the same archive.
+		# O_APPEND alone isn't atomic over NFS and a write can come up short, so the whole
+		# record is written while holding an exclusive lock on the file.
+		fd: int = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+		try:
+			if fcntl is not None:
+				fcntl.lockf(fd, fcntl.LOCK_EX)
+			remaining: memoryview = memoryview(record)
+			while len(remaining) > 0:
+				written: int = os.write(fd, remaining)
+				remaining = remaining[written:]
+			os.fsync(fd)
+		finally:
+			# Closing the file releases the lock
+			os.close(fd)
+
+	def entries(self) -> list[Entry]:
+		"""
+		The latest record for every work, in the order they were first archived.
+		A record left incomplete by an interrupted write is ignored.
+		"""
+		latest: dict[tuple[int, Optional[int]], Entry] = {}
+		for entry in self._records():
+			latest[entry.key()] = entry
+		return list(latest.values())
+
+	def read(self, entry: Entry) -> str:
+		"""
+		Loads the raw page of an entry.
+		"""
+		with open(self.path, "rb") as file:
+			file.seek(entry.offset)
+			_, meta_length, page_length = HEADER.unpack(file.read(HEADER.size))
+			file.seek(meta_length, 1)
+			return zlib.decompress(file.read(page_length)).decode("utf-8")
+
+	def _records(self) -> Iterator[Entry]:
+		if not os.path.exists(self.path):
+			return
+		with open(self.path, "rb") as file:
+			size: int = os.fstat(file.fileno()).st_size
+			while True:
+				offset: int = file.tell()
+				header: bytes = file.read(HEADER.size)
+				if len(header) < HEADER.size:
+					return
+				magic, meta_length, page_length = HEADER.unpack(header)
+				if magic != MAGIC or offset + HEADER.size + meta_length + page_length > size:
+					print(f"[WARNING] Archive {self.path} is damaged at byte {offset}, ignoring the rest")
+					return
+				metadata: dict[str, Any] = json.loads(file.read(meta_length).decode("utf-8"))
+				file.seek(page_length, 1)
+				yield Entry(offset, metadata)
@@ -1,4 +1,5 @@
 
+import os
 import re
 from typing import Any, Optional, Union, TypeAlias
 
@@ -6,6 +7,9 @@ from bs4 import NavigableString, Tag
 
 NavStr: TypeAlias = Union[Tag, NavigableString, None]
 
+# Can be pointed at a local stand-in for testing, links given on the command line are still matched as AO3 links
+BASE_URL: str = os.environ.get("AO3_DL_BASE_URL", "https://archiveofourown.org").rstrip("/")
+
 MATCH_REGEX: str = r"((?:https:\/\/)?archiveofourown\.org\/((?:works|series)\/\d+|\d+)|users\/(.+))|(\d+)"
 
 def extract_int(text: str) -> Optional[int]:
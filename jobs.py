@@ -0,0 +1,206 @@
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from types import TracebackType
+from typing import Optional
+
+# Seconds a claimed job stays with its worker before it can be reclaimed
+LEASE_SECONDS: int = 600
+# Number of times a job is handed out before it's marked as failed
+MAX_ATTEMPTS: int = 3
+
+PENDING: str = "pending"
+CLAIMED: str = "claimed"
+DONE: str = "done"
+FAILED: str = "failed"
+
+class Job:
+	id: int
+	work_id: int
+	series_id: Optional[int]
+	attempts: int
+
+	def __init__(self, job_id: int, work_id: int, series_id: Optional[int], attempts: int):
+		self.id = job_id
+		self.work_id = work_id
+		self.series_id = series_id
+		self.attempts = attempts
+
+class JobQueue:
+	"""
+	Work queue stored in a SQLite database, so several worker processes can share it.
+
+	Workers claim jobs with a lease. A worker that dies simply stops renewing its lease,
+	and once it runs out the job goes back to being claimable by anyone else.
+	"""
+	path: str
+	worker: str
+
+	_db: sqlite3.Connection
+
+	def __init__(self, path: str, worker: Optional[str] = None):
+		self.path = path
+		self.worker = worker if worker is not None else f"{socket.gethostname()}:{os.getpid()}"
+
+		# Transactions are managed manually so claims can take the write lock up front
+		self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+		self._db.execute("PRAGMA busy_timeout = 60000")
+		self._db.execute("""
+			CREATE TABLE IF NOT EXISTS jobs (
+				id INTEGER PRIMARY KEY,
+				work_id INTEGER NOT NULL,
+				series_id INTEGER,
+				state TEXT NOT NULL DEFAULT 'pending',
+				worker TEXT,
+				lease_expires REAL,
+				attempts INTEGER NOT NULL DEFAULT 0,
+				error TEXT,
+				finished REAL
+			)
+		""")
+		# A plain UNIQUE constraint treats every NULL series id as distinct, so standalone works are mapped to -1
+		self._db.execute("CREATE UNIQUE INDEX IF NOT EXISTS jobs_work ON jobs (work_id, IFNULL(series_id, -1))")
+		self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires)")
+
+	def close(self) -> None:
+		self._db.close()
+
+	def add(self, work_id: int, series_id: Optional[int] = None) -> bool:
+		"""
+		Queues a work. Works that are already queued for the same series are ignored.
+		Returns:
+			bool: Whether a new job was added.
+		"""
+		cursor: sqlite3.Cursor = self._db.execute("INSERT OR IGNORE INTO jobs (work_id, series_id) VALUES (?, ?)", (work_id, series_id))
+		return cursor.rowcount > 0
+
+	def claim(self, lease: int = LEASE_SECONDS) -> Optional[Job]:
+		"""
+		Takes the next pending job, or one whose lease has run out.
+		Returns:
+			Optional[Job]: The claimed job, or None if there is nothing left to do.
+		"""
+		now: float = time.time()
+		self._db.execute("BEGIN IMMEDIATE")
+		try:
+			# Jobs whose worker died too many times are given up on
+			self._db.execute(
+				"UPDATE jobs SET state = ?, error = 'Lease expired', finished = ? WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+				(FAILED, now, CLAIMED, now, MAX_ATTEMPTS)
+			)
+			row: Optional[tuple[int, int, Optional[int], int]] = self._db.execute(
+				"SELECT id, work_id, series_id, attempts FROM jobs WHERE state = ? OR (state = ? AND lease_expires < ?) ORDER BY id LIMIT 1",
+				(PENDING, CLAIMED, now)
+			).fetchone()
+			if row is None:
+				self._db.execute("COMMIT")
+				return None
+			self._db.execute(
+				"UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+				(CLAIMED, self.worker, now + lease, row[0])
+			)
+			self._db.execute("COMMIT")
+		except BaseException:
+			self._db.execute("ROLLBACK")
+			raise
+
+		return Job(row[0], row[1], row[2], row[3] + 1)
+
+	def renew(self, job: Job, lease: int = LEASE_SECONDS) -> bool:
+		"""
+		Extends the lease on a job. Call this between long steps.
+		Returns:
+			bool: False if the lease was lost to another worker.
+		"""
+		cursor: sqlite3.Cursor = self._db.execute(
+			"UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND state = ?",
+			(time.time() + lease, job.id, self.worker, CLAIMED)
+		)
+		return cursor.rowcount > 0
+
+	def complete(self, job: Job) -> bool:
+		"""
+		Returns:
+			bool: False if the lease had already been lost to another worker, so the result wasn't recorded.
+		"""
+		return self._finish(job, DONE, None)
+
+	def fail(self, job: Job, error: str, retry: bool = True) -> bool:
+		"""
+		Reports a failed attempt. The job is put back in the queue until it runs out of attempts,
+		unless retry is False because trying again can't help.
+		Returns:
+			bool: False if the lease had already been lost to another worker, so the result wasn't recorded.
+		"""
+		if retry and job.attempts < MAX_ATTEMPTS:
+			cursor: sqlite3.Cursor = self._db.execute(
+				"UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, error = ? WHERE id = ? AND worker = ? AND state = ?",
+				(PENDING, error, job.id, self.worker, CLAIMED)
+			)
+			return cursor.rowcount > 0
+		return self._finish(job, FAILED, error)
+
+	def counts(self) -> dict[str, int]:
+		"""
+		Number of jobs in each state.
+		"""
+		counts: dict[str, int] = {PENDING: 0, CLAIMED: 0, DONE: 0, FAILED: 0}
+		for state, count in self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+			counts[state] = count
+		return counts
+
+	def failures(self) -> list[tuple[int, str]]:
+		return list(self._db.execute("SELECT work_id, error FROM jobs WHERE state = ? ORDER BY id", (FAILED,)))
+
+	def _finish(self, job: Job, state: str, error: Optional[str]) -> bool:
+		cursor: sqlite3.Cursor = self._db.execute(
+			"UPDATE jobs SET state = ?, error = ?, lease_expires = NULL, finished = ? WHERE id = ? AND worker = ? AND state = ?",
+			(state, error, time.time(), job.id, self.worker, CLAIMED)
+		)
+		return cursor.rowcount > 0
+
+class Heartbeat:
+	"""
+	Keeps renewing the lease on a job from a background thread, for as long as the worker is busy with it.
+	Use it as a context manager around the work. Renewals happen three times per lease.
+	"""
+	lost: bool
+
+	_path: str
+	_worker: str
+	_job: Job
+	_lease: int
+	_stop: threading.Event
+	_thread: threading.Thread
+
+	def __init__(self, queue: JobQueue, job: Job, lease: int = LEASE_SECONDS):
+		self.lost = False
+		self._path = queue.path
+		self._worker = queue.worker
+		self._job = job
+		self._lease = lease
+		self._stop = threading.Event()
+		self._thread = threading.Thread(target=self._run, daemon=True)
+
+	def __enter__(self) -> "Heartbeat":
+		self._thread.start()
+		return self
+
+	def __exit__(self, exc_type: Optional[type[BaseException]], exc: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+		self._stop.set()
+		self._thread.join()
+
+	def _run(self) -> None:
+		# SQLite connections can't be shared between threads
+		queue: JobQueue = JobQueue(self._path, self._worker)
+		try:
+			while not self._stop.wait(self._lease / 3):
+				if not queue.renew(self._job, self._lease):
+					self.lost = True
+					print(f"[WARNING] Lost the lease on work {self._job.work_id}, another worker may be rendering it")
+					return
+		finally:
+			queue.close()
@@ -0,0 +1,89 @@
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from server import StandInServer, add_arguments, config_from
+
+ROOT_DIR: Path = Path(__file__).resolve().parent.parent
+SCRIPT: str = str(ROOT_DIR / "ao3-dl.py")
+OUTPUT_FORMATS: list[str] = ["pdf", "epub", "html"]
+
+def _run(command: list[str], cwd: str, env: dict[str, str], log: str) -> subprocess.Popen[bytes]:
+	with open(log, "ab") as output:
+		return subprocess.Popen([sys.executable, SCRIPT] + command, cwd=cwd, env=env, stdout=output, stderr=subprocess.STDOUT)
+
+def _count_outputs(directory: str) -> int:
+	"""
+	Number of works rendered, counted by distinct output file names.
+	"""
+	names: set[str] = set()
+	for path in Path(directory).rglob("*"):
+		if path.suffix.lstrip(".") in OUTPUT_FORMATS:
+			names.add(str(path.with_suffix("")))
+	return len(names)
+
+def main(args: argparse.Namespace) -> None:
+	server: StandInServer = StandInServer(("127.0.0.1", 0), config_from(args))
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+
+	output_dir: str = args.output or tempfile.mkdtemp(prefix="ao3-dl-load-")
+	os.makedirs(output_dir, exist_ok=True)
+	log: str = f"{output_dir}/ao3-dl.log"
+	env: dict[str, str] = dict(os.environ, AO3_DL_BASE_URL=server.url())
+
+	formats: list[str] = [f"--{x}" for x in args.format]
+	if args.stream:
+		formats.append("--stream")
+	url: str = f"archiveofourown.org/users/{args.username}"
+
+	print(f"[INFO] Stand-in at {server.url()}, writing to {output_dir}")
+	start: float = time.monotonic()
+
+	if args.workers <= 0:
+		_run([url] + formats, output_dir, env, log).wait()
+	else:
+		queue: str = f"{output_dir}/jobs.db"
+		_run(["enqueue", queue, url], output_dir, env, log).wait()
+		workers: list[subprocess.Popen[bytes]] = [
+			_run(["worker", queue, "--poll", "1"] + formats, output_dir, env, log) for _ in range(args.workers)
+		]
+		for worker in workers:
+			worker.wait()
+
+	elapsed: float = time.monotonic() - start
+	server.shutdown()
+
+	works: int = _count_outputs(output_dir)
+	stats: dict[str, object] = server.stats.as_dict()
+	# ru_maxrss is the largest single child, so with several workers this is per worker
+	peak_memory: int = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+	print(f"Works rendered:\t{works}")
+	print(f"Elapsed:\t{elapsed:.1f}s")
+	print(f"Works/min:\t{works / elapsed * 60:.1f}")
+	print(f"Requests:\t{stats['requests']}")
+	print(f"Retries:\t{stats['retries']}")
+	print(f"Bytes served:\t{stats['bytes']}")
+	print(f"By status:\t{stats['by_status']}")
+	print(f"By kind:\t{stats['by_kind']}")
+	print(f"Peak memory:\t{peak_memory / 1024:.1f} MB")
+	print(f"Log:\t\t{log}")
+
+if __name__ == "__main__":
+	parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Runs ao3-dl against a local stand-in server and reports throughput, request counts and memory use.')
+	parser.add_argument('--format', type=str, action='append', choices=OUTPUT_FORMATS, help="Output format to render. Can be given more than once, defaults to html.")
+	parser.add_argument('--stream', action='store_true', help="Run ao3-dl with --stream.")
+	parser.add_argument('--workers', type=int, default=0, help="Number of queue workers to run. 0 runs a single ao3-dl process.")
+	parser.add_argument('--output', type=str, help="Directory to render into. Defaults to a new temporary directory.")
+	add_arguments(parser)
+	parsed: argparse.Namespace = parser.parse_args()
+	if parsed.format is None:
+		parsed.format = ["html"]
+	main(parsed)
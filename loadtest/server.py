@@ -0,0 +1,362 @@
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from datetime import date, timedelta
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+WORKS_PER_PAGE: int = 20
+
+RATINGS: list[tuple[str, str]] = [
+	("general-audience", "General Audiences"),
+	("teen", "Teen And Up Audiences"),
+	("mature", "Mature"),
+	("explicit", "Explicit"),
+	("notrated", "Not Rated")
+]
+FANDOMS: list[str] = ["Stand-In Fandom", "Synthetic Saga", "Load Test Chronicles", "Placeholder Universe"]
+TAGS: list[str] = ["Fluff", "Angst", "Hurt/Comfort", "Slow Burn", "Alternate Universe", "Found Family", "Humor"]
+WORDS: list[str] = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore magna aliqua".split()
+
+@dataclass
+class Config:
+	"""
+	Shape of the synthetic archive and the faults injected into it.
+	"""
+	username: str = "loadtest"
+	works: int = 10000
+	max_chapters: int = 10
+	chapter_words: int = 2000
+	series_size: int = 10
+	# Seconds added to every response
+	latency: float = 0.0
+	# Fraction of requests answered with a 503
+	error_rate: float = 0.0
+	# Every `burst_every` requests, the next `burst_length` are answered with a 429
+	burst_every: int = 0
+	burst_length: int = 0
+	# Fraction of works that redirect to the login page
+	restricted_rate: float = 0.0
+	seed: int = 0
+
+@dataclass
+class Stats:
+	requests: int = 0
+	bytes: int = 0
+	by_status: dict[int, int] = field(default_factory=dict)
+	by_kind: dict[str, int] = field(default_factory=dict)
+	lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+	def record(self, kind: str, status: int, size: int) -> None:
+		with self.lock:
+			self.bytes += size
+			self.by_status[status] = self.by_status.get(status, 0) + 1
+			self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+
+	def retries(self) -> int:
+		"""
+		Responses that make ao3-dl retry the request.
+		"""
+		return sum(count for status, count in self.by_status.items() if status == 429 or status >= 500)
+
+	def as_dict(self) -> dict[str, object]:
+		with self.lock:
+			return {
+				"requests": self.requests,
+				"bytes": self.bytes,
+				"retries": self.retries(),
+				"by_status": dict(self.by_status),
+				"by_kind": dict(self.by_kind)
+			}
+
+class SyntheticWork:
+	"""
+	A work generated from its id, so the listing blurb and the work page always agree.
+	"""
+	id: int
+	title: str
+	author: str
+	fandom: str
+	rating: tuple[str, str]
+	tags: list[str]
+	chapters: int
+	completed: bool
+	published: date
+	updated: date
+	restricted: bool
+	series_id: Optional[int]
+	part: int
+
+	_config: Config
+
+	def __init__(self, work_id: int, config: Config):
+		rng: random.Random = random.Random(config.seed * 1000003 + work_id)
+		self._config = config
+		self.id = work_id
+		self.title = f"Synthetic Work {work_id}"
+		self.author = config.username
+		self.fandom = rng.choice(FANDOMS)
+		self.rating = rng.choice(RATINGS)
+		self.tags = rng.sample(TAGS, 3)
+		self.chapters = rng.randint(1, config.max_chapters)
+		self.completed = rng.random() < 0.7
+		self.published = date(2015, 1, 1) + timedelta(days=rng.randint(0, 3000))
+		self.updated = self.published + timedelta(days=rng.randint(0, 300))
+		self.restricted = rng.random() < config.restricted_rate
+
+		# Every other block of `series_size` works forms a series
+		block: int = (work_id - 1) // config.series_size if config.series_size > 0 else 1
+		self.series_id = block + 1 if block % 2 == 0 else None
+		self.part = (work_id - 1) % config.series_size + 1 if self.series_id is not None else 0
+
+	def words(self) -> int:
+		return self.chapters * self._config.chapter_words
+
+	def chapter_count(self) -> str:
+		return f"{self.chapters}/{self.chapters if self.completed else '?'}"
+
+	def blurb(self) -> str:
+		rating_class, rating = self.rating
+		return f"""
+		<li id="work_{self.id}" class="work blurb group work-{self.id}" role="article">
+			<div class="header module">
+				<h4 class="heading"><a href="/works/{self.id}">{escape(self.title)}</a> by <a rel="author" href="/users/{self.author}/pseuds/{self.author}">{self.author}</a></h4>
+				<h5 class="fandoms heading"><span class="landmark">Fandoms:</span> <a class="tag" href="/tags/x/works">{self.fandom}</a></h5>
+				<ul class="required-tags">
+					<li><a class="help symbol question modal"><span class="rating-{rating_class} rating" title="{rating}"><span class="text">{rating}</span></span></a></li>
+					<li><a class="help symbol question modal"><span class="complete-{'yes' if self.completed else 'no'} iswip" title="{'Complete Work' if self.completed else 'Work in Progress'}"><span class="text">{'Complete Work' if self.completed else 'Work in Progress'}</span></span></a></li>
+				</ul>
+				<p class="datetime">{self.updated.strftime("%d %b %Y")}</p>
+			</div>
+			<h6 class="landmark heading">Tags</h6>
+			<ul class="tags commas">
+				{"".join(f'<li class="freeforms"><a class="tag" href="/tags/x/works">{escape(tag)}</a></li>' for tag in self.tags)}
+			</ul>
+			<h6 class="landmark heading">Summary</h6>
+			<blockquote class="userstuff summary"><p>Summary of work {self.id}.</p></blockquote>
+			<dl class="stats">
+				<dt class="language">Language:</dt><dd class="language" lang="en">English</dd>
+				<dt class="words">Words:</dt><dd class="words">{self.words():,}</dd>
+				<dt class="chapters">Chapters:</dt><dd class="chapters"><a href="/works/{self.id}/chapters/1">{self.chapters}</a>/{self.chapters if self.completed else '?'}</dd>
+			</dl>
+		</li>"""
+
+	def page(self) -> str:
+		rng: random.Random = random.Random(self.id)
+		chapters: str = "".join(self._chapter(rng, i + 1) for i in range(self.chapters))
+		# Only finished oneshots are laid out without chapter divisions
+		if self.chapter_count() == "1/1":
+			chapters = f'<div class="userstuff" role="article"><h3 class="landmark heading" id="work">Work Text:</h3>{self._text(rng)}</div>'
+
+		series: str = ""
+		if self.series_id is not None:
+			previous: str = f'<a href="/works/{self.id - 1}" class="previous">←</a> ' if self.part > 1 else ""
+			following: str = f' <a href="/works/{self.id + 1}" class="next">→</a>' if self.part < self._config.series_size and self.id < self._config.works else ""
+			series = f"""
+				<dt class="series">Series:</dt>
+				<dd class="series"><span class="series">{previous}<span class="position">Part {self.part} of <a href="/series/{self.series_id}">Synthetic Series {self.series_id}</a></span>{following}</span></dd>"""
+
+		return _document(f"""
+			<div class="wrapper">
+				<dl class="work meta group">
+					<dt class="rating tags">Rating:</dt><dd class="rating tags"><ul class="commas"><li><a class="tag">{self.rating[1]}</a></li></ul></dd>
+					<dt class="warning tags">Archive Warning:</dt><dd class="warning tags"><ul class="commas"><li><a class="tag">No Archive Warnings Apply</a></li></ul></dd>
+					<dt class="category tags">Category:</dt><dd class="category tags"><ul class="commas"><li><a class="tag">Gen</a></li></ul></dd>
+					<dt class="fandom tags">Fandom:</dt><dd class="fandom tags"><ul class="commas"><li><a class="tag">{self.fandom}</a></li></ul></dd>
+					<dt class="freeform tags">Additional Tags:</dt><dd class="freeform tags"><ul class="commas">{"".join(f'<li><a class="tag">{escape(tag)}</a></li>' for tag in self.tags)}</ul></dd>
+					<dt class="language">Language:</dt><dd class="language" lang="en">English</dd>
+					{series}
+					<dt class="stats">Stats:</dt>
+					<dd class="stats"><dl class="stats">
+						<dt class="published">Published:</dt><dd class="published">{self.published.isoformat()}</dd>
+						<dt class="status">Updated:</dt><dd class="status">{self.updated.isoformat()}</dd>
+						<dt class="words">Words:</dt><dd class="words">{self.words():,}</dd>
+						<dt class="chapters">Chapters:</dt><dd class="chapters">{self.chapter_count()}</dd>
+					</dl></dd>
+				</dl>
+			</div>
+			<div id="workskin">
+				<div class="preface group">
+					<h2 class="title heading">{escape(self.title)}</h2>
+					<h3 class="byline heading"><a rel="author" href="/users/{self.author}/pseuds/{self.author}">{self.author}</a></h3>
+					<div class="summary module" role="complementary">
+						<h3 class="heading">Summary:</h3>
+						<blockquote class="userstuff"><p>Summary of work {self.id}.</p></blockquote>
+					</div>
+				</div>
+				<div id="chapters" role="article">{chapters}</div>
+			</div>
+			<div id="feedback" class="feedback"><h3 class="landmark heading">Actions</h3></div>""")
+
+	def _chapter(self, rng: random.Random, chapter: int) -> str:
+		return f"""
+			<div class="chapter" id="chapter-{chapter}" role="article">
+				<div class="chapter preface group" role="complementary">
+					<h3 class="title"><a href="/works/{self.id}/chapters/{chapter}">Chapter {chapter}</a>: Part {chapter}</h3>
+				</div>
+				<div class="userstuff module" role="article">
+					<h3 class="landmark heading" id="work">Chapter Text</h3>
+					{self._text(rng)}
+				</div>
+			</div>"""
+
+	def _text(self, rng: random.Random) -> str:
+		paragraphs: list[str] = []
+		remaining: int = self._config.chapter_words
+		while remaining > 0:
+			count: int = min(remaining, rng.randint(40, 120))
+			paragraphs.append(f"<p>{' '.join(rng.choices(WORDS, k=count))}</p>")
+			remaining -= count
+		return "\n".join(paragraphs)
+
+def _document(body: str) -> str:
+	return f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Archive of Our Own Stand-In</title></head><body><div id="main">{body}</div></body></html>'
+
+def series_page(series_id: int, page: int, config: Config) -> Optional[str]:
+	first: int = (series_id - 1) * config.series_size + 1
+	if config.series_size <= 0 or (series_id - 1) % 2 != 0 or first > config.works:
+		return None
+	last: int = min(first + config.series_size, config.works + 1)
+	start: int = first + (page - 1) * WORKS_PER_PAGE
+	works: list[SyntheticWork] = [SyntheticWork(x, config) for x in range(start, min(start + WORKS_PER_PAGE, last))]
+	return _document(f"""
+		<h2 class="heading">Synthetic Series {series_id}</h2>
+		<dl class="series meta group">
+			<dt>Stats:</dt><dd><dl class="stats"><dt class="works">Works:</dt><dd class="works">{last - first}</dd></dl></dd>
+		</dl>
+		<ul class="series work index group">{"".join(work.blurb() for work in works)}</ul>
+		{_pagination(f"/series/{series_id}", page, start + WORKS_PER_PAGE < last)}""")
+
+def user_page(page: int, config: Config) -> str:
+	first: int = (page - 1) * WORKS_PER_PAGE + 1
+	works: list[SyntheticWork] = [SyntheticWork(x, config) for x in range(first, min(first + WORKS_PER_PAGE, config.works + 1))]
+	return _document(f"""
+		<h2 class="heading">{first} - {first + len(works) - 1} of {config.works} Works by {config.username}</h2>
+		<ol class="work index group">{"".join(work.blurb() for work in works)}</ol>
+		{_pagination(f"/users/{config.username}/works", page, first + WORKS_PER_PAGE <= config.works)}""")
+
+def _pagination(path: str, page: int, has_next: bool) -> str:
+	next_link: str = f'<a rel="next" href="{path}?page={page + 1}">Next →</a>' if has_next else '<span class="disabled">Next →</span>'
+	return f'<ol class="pagination actions" role="navigation"><li class="next">{next_link}</li></ol>'
+
+class Handler(BaseHTTPRequestHandler):
+	server: "StandInServer"
+
+	def do_GET(self) -> None: # pylint: disable=invalid-name
+		config: Config = self.server.config
+		url = urlparse(self.path)
+		parts: list[str] = [x for x in url.path.split("/") if x != ""]
+
+		if parts == ["_stats"]:
+			self._send(200, json.dumps(self.server.stats.as_dict()), "stats", "application/json")
+			return
+
+		self.server.count()
+		if config.latency > 0:
+			time.sleep(config.latency * random.uniform(0.5, 1.5))
+		if self.server.throttled():
+			self._send(429, "Retry later", "throttled", headers={"Retry-After": "1"})
+			return
+		if random.random() < config.error_rate:
+			self._send(503, "Service unavailable", "error")
+			return
+
+		if len(parts) == 2 and parts[0] == "works" and parts[1].isdigit() and 0 < int(parts[1]) <= config.works:
+			work: SyntheticWork = SyntheticWork(int(parts[1]), config)
+			if work.restricted:
+				self._send(302, "", "restricted", headers={"Location": f"/users/login?restricted=true&return_to=%2Fworks%2F{work.id}"})
+				return
+			self._send(200, work.page(), "work")
+		elif len(parts) == 2 and parts[0] == "series" and parts[1].isdigit():
+			number: int = int(parse_qs(url.query).get("page", ["1"])[0])
+			page: Optional[str] = series_page(int(parts[1]), number, config)
+			self._send(200 if page is not None else 404, page or "Not found", "series")
+		elif parts == ["users", config.username, "works"]:
+			number = int(parse_qs(url.query).get("page", ["1"])[0])
+			self._send(200, user_page(number, config), "user")
+		elif parts == ["users", "login"]:
+			self._send(200, _document('<h2 class="heading">Log In</h2>'), "login")
+		else:
+			self._send(404, "Not found", "missing")
+
+	def _send(self, status: int, body: str, kind: str, content_type: str = "text/html; charset=utf-8", headers: Optional[dict[str, str]] = None) -> None:
+		data: bytes = body.encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(data)))
+		for key, value in (headers or {}).items():
+			self.send_header(key, value)
+		self.end_headers()
+		self.wfile.write(data)
+		if kind != "stats":
+			self.server.stats.record(kind, status, len(data))
+
+	def log_message(self, format: str, *args: object) -> None: # pylint: disable=redefined-builtin
+		pass
+
+class StandInServer(ThreadingHTTPServer):
+	"""
+	Serves a synthetic user, their series and works in the markup ao3-dl reads.
+	"""
+	daemon_threads = True
+
+	config: Config
+	stats: Stats
+
+	def __init__(self, address: tuple[str, int], config: Config):
+		super().__init__(address, Handler)
+		self.config = config
+		self.stats = Stats()
+
+	def url(self) -> str:
+		host, port = self.server_address[:2]
+		return f"http://{host!s}:{port}"
+
+	def count(self) -> None:
+		with self.stats.lock:
+			self.stats.requests += 1
+
+	def throttled(self) -> bool:
+		if self.config.burst_every <= 0:
+			return False
+		with self.stats.lock:
+			position: int = self.stats.requests % (self.config.burst_every + self.config.burst_length)
+		return position >= self.config.burst_every
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+	parser.add_argument('--username', type=str, default=Config.username, help="Name of the synthetic user.")
+	parser.add_argument('--works', type=int, default=Config.works, help="Number of works by the synthetic user.")
+	parser.add_argument('--max-chapters', type=int, default=Config.max_chapters, help="Most chapters a work can have.")
+	parser.add_argument('--chapter-words', type=int, default=Config.chapter_words, help="Words in each chapter.")
+	parser.add_argument('--series-size', type=int, default=Config.series_size, help="Works per series. Every other block of works is a series, 0 disables series.")
+	parser.add_argument('--latency', type=float, default=Config.latency, help="Seconds added to each response, jittered by ±50%%.")
+	parser.add_argument('--error-rate', type=float, default=Config.error_rate, help="Fraction of requests answered with a 503.")
+	parser.add_argument('--burst-every', type=int, default=Config.burst_every, help="Number of requests between bursts of 429s.")
+	parser.add_argument('--burst-length', type=int, default=Config.burst_length, help="Number of requests answered with a 429 in each burst.")
+	parser.add_argument('--restricted-rate', type=float, default=Config.restricted_rate, help="Fraction of works that redirect to the login page.")
+	parser.add_argument('--seed', type=int, default=Config.seed, help="Seed for the generated works.")
+
+def config_from(args: argparse.Namespace) -> Config:
+	names: set[str] = {f.name for f in fields(Config)}
+	return Config(**{key: value for key, value in vars(args).items() if key in names})
+
+if __name__ == "__main__":
+	arg_parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Local stand-in for archiveofourown.org serving synthetic works. Point ao3-dl at it with AO3_DL_BASE_URL.')
+	arg_parser.add_argument('--host', type=str, default="127.0.0.1")
+	arg_parser.add_argument('--port', type=int, default=8000)
+	add_arguments(arg_parser)
+	parsed: argparse.Namespace = arg_parser.parse_args()
+
+	server: StandInServer = StandInServer((parsed.host, parsed.port), config_from(parsed))
+	print(f"Serving {parsed.works} works by {parsed.username} at {server.url()}")
+	print(f"\tAO3_DL_BASE_URL={server.url()} python ao3-dl.py archiveofourown.org/users/{parsed.username}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		print(json.dumps(server.stats.as_dict(), indent=4))
@@ -1,18 +1,31 @@
 
+import io
+import re
 import sys
-from typing import Optional, Union
+from dataclasses import dataclass
+from typing import IO, Any, Iterator, Optional, Union
 from datetime import datetime
 
 import requests
-from requests.exceptions import ReadTimeout
+from requests.exceptions import ChunkedEncodingError, ConnectionError as RequestsConnectionError, ReadTimeout
 from bs4 import BeautifulSoup, ResultSet, Tag, PageElement
 
-from helpers import extract_int, NavStr
+from archive import Archive
+from helpers import BASE_URL, extract_int, NavStr
+from storage import PackedText, SpillFile
+from streaming import FragmentExtractor, Handler, Matcher, has_class, spool
 
 MAX_ATTEMPTS: int = 5
 
+# Used to estimate the size of a download from a blurb's word count
+PAGE_OVERHEAD_BYTES: int = 40 * 1024
+BYTES_PER_WORD: int = 6
+WORDS_PER_PAGE: int = 300
+
 class Work:
 	class SeriesMetadata:
+		__slots__ = ("id", "title", "length", "part")
+
 		id: int
 		title: str
 		length: int
@@ -25,17 +38,31 @@ class Work:
 			self.part = part_in_series
 
 	class Chapter:
+		"""
+		A chapter's title and body. The body is stored compressed, and spilled to disk if it's large,
+		so it's only expanded while a writer is using it.
+		"""
+		__slots__ = ("title", "_content")
+
 		title: str
-		content: str
+		_content: PackedText
 
-		def __init__(self, title: str, content: str):
+		def __init__(self, title: str, content: str, spill: Optional[SpillFile] = None):
 			self.title = title
-			self.content = content
+			self._content = PackedText(content, spill)
+
+		@property
+		def content(self) -> str:
+			return str(self._content)
 
 	id: int
-	content: str
 	restricted: bool
 
+	_content: PackedText
+	_spill: SpillFile
+	# Lengths of linked series that are already known and don't need to be fetched
+	_series_lengths: dict[int, int]
+
 	title: str
 	author: str
 
@@ -60,9 +87,11 @@ class Work:
 	characters: Optional[list[str]]
 	tags: Optional[list[str]]
 
-	def __init__(self, work_id: int, active_series: Optional["Series"] = None, cookies: Optional[dict[str, str]] = None):
+	def __init__(self, work_id: int, active_series: Optional["Series"] = None, cookies: Optional[dict[str, str]] = None, stream: bool = False, archive: Optional[Archive] = None):
 		self.id = work_id
 		self.active_series = active_series
+		self._spill = SpillFile()
+		self._series_lengths = {}
 
 		attempts: int = 0
 		success: bool = False
@@ -71,57 +100,34 @@ class Work:
 
 		while not success and attempts <= MAX_ATTEMPTS:
 			try:
-				response = requests.get(self.url(), timeout=10, cookies=cookies)
+				response = requests.get(self.url(), timeout=10, cookies=cookies, stream=stream)
 				if response.status_code != 200:
+					response.close()
 					attempts += 1
 					print(f"Unexpected error: {response.status_code}. Retrying {attempts}/{MAX_ATTEMPTS}.")
 					continue
 				success = True
 
 				self.restricted = "restricted=true" in response.url
+				if self.restricted:
+					response.close()
 
 				if not self.restricted:
-					soup = BeautifulSoup(response.text, "html.parser")
-
-					self.title = self._get_title(soup)
-					self.author = self._get_author(soup)
-
-					self._get_meta(soup)
-					self._get_attached_series(soup)
-
-					# Remove "chapter text" heading
-					for heading in soup.find_all("h3", class_="landmark heading", id="work"):
-						heading.string = ""
-
-					self.chapter_list = []
-					if not self.is_single_chapter:
-						for i in range(self.released_chapters):
-							title: str | None = self._chapter_title(soup, i + 1)
-
-							content: NavStr = self._get_chapter_content(soup, i + 1)
-							if not isinstance(content, Tag):
-								continue
-
-							title_tag: Union[NavStr, int] = content.find("h3", class_="title")
-
-							if title is not None:
-								title = f"Chapter {i + 1}: {title}"
-							else:
-								title = f"Chapter {i + 1}"
-
-							if isinstance(title_tag, Tag):
-								title_tag.string = title
-
-							self.chapter_list.append(Work.Chapter(title, content.prettify()))
+					if stream:
+						with spool(response) as page:
+							self._parse_stream(page)
+							if archive is not None:
+								page.seek(0)
+								archive.add(self.archive_metadata(), page)
 					else:
-						full_content: NavStr = soup.find("div", id="chapters")
-						if isinstance(full_content, Tag):
-							self.chapter_list.append(Work.Chapter(self.title, full_content.prettify()))
-
-					self.content = soup.prettify()
-			except ReadTimeout:
+						self._parse(BeautifulSoup(response.text, "html.parser"))
+						if archive is not None:
+							archive.add(self.archive_metadata(), io.BytesIO(response.content))
+			# While streaming, a stalled body surfaces as a ConnectionError from iter_content rather than a ReadTimeout
+			except (ReadTimeout, ChunkedEncodingError, RequestsConnectionError):
 				if attempts >= MAX_ATTEMPTS:
 					break
+				success = False
 				attempts += 1
 				print(f"Connection timed out: Retrying {attempts}/{MAX_ATTEMPTS}.")
 				continue
@@ -130,9 +136,134 @@ class Work:
 			print("Failed to download. Try again.")
 			sys.exit(1)
 
+	@classmethod
+	def from_page(cls, work_id: int, page: str, series_lengths: dict[int, int], active_series: Optional["Series"] = None) -> "Work":
+		"""
+		Builds a work from a page that was already downloaded, e.g. one read from an archive.
+		Nothing is fetched, the lengths of any linked series have to be given.
+		"""
+		work: Work = cls.__new__(cls)
+		work.id = work_id
+		work.active_series = active_series
+		work.restricted = False
+		work._spill = SpillFile()
+		work._series_lengths = dict(series_lengths)
+		work._parse(BeautifulSoup(page, "html.parser"))
+		return work
+
+	def archive_metadata(self) -> dict[str, Any]:
+		"""
+		What an archive needs to render the work again offline, plus enough to tell works apart when listing it.
+		"""
+		active_series: Optional[dict[str, Any]] = None
+		if self.active_series is not None:
+			active_series = {"id": self.active_series.id, "title": self.active_series.title, "length": self.active_series.length}
+		return {
+			"id": self.id,
+			"url": self.url(),
+			"fetched": datetime.now().isoformat(timespec="seconds"),
+			"title": self.title,
+			"author": self.author,
+			"words": self.words,
+			"chapters": self.chapters,
+			"updated": self.updated.date().isoformat() if self.updated is not None else None,
+			"series": active_series,
+			"series_lengths": {str(x.id): x.length for x in self.series}
+		}
+
+	def _parse(self, soup: BeautifulSoup) -> None:
+		self.title = self._get_title(soup)
+		self.author = self._get_author(soup)
+
+		self._get_meta(soup)
+		self._get_attached_series(soup)
+
+		self._remove_landmarks(soup)
+
+		self.chapter_list = []
+		if not self.is_single_chapter:
+			for i in range(self.released_chapters):
+				content: NavStr = self._get_chapter_content(soup, i + 1)
+				if not isinstance(content, Tag):
+					continue
+				self.chapter_list.append(self._build_chapter(content, i + 1, self._chapter_title(soup, i + 1)))
+		else:
+			full_content: NavStr = soup.find("div", id="chapters")
+			if isinstance(full_content, Tag):
+				self.chapter_list.append(Work.Chapter(self.title, full_content.prettify(), self._spill))
+
+		# The chapter text is already kept in the chapter list
+		chapters: NavStr = soup.find("div", id="chapters")
+		if isinstance(chapters, Tag):
+			chapters.decompose()
+
+		self._content = PackedText(soup.prettify(), self._spill)
+
+	# Parses a spooled page one element at a time.
+	# Only the preface (title, byline, metadata and summary) is kept; each chapter is
+	# parsed on its own as soon as it closes, so the whole page never has to be built into a tree.
+	def _parse_stream(self, page: IO[bytes]) -> None:
+		preface: dict[str, str] = {}
+		self.title = "Unknown"
+		self.author = "Unknown"
+		self.chapter_list = []
+
+		def first(key: str, name: str, class_: str) -> Matcher:
+			return lambda tag, attrs: key not in preface and tag == name and has_class(attrs, class_)
+
+		def keep(key: str) -> Handler:
+			def handler(fragment: str) -> None:
+				preface[key] = fragment
+				soup: BeautifulSoup = BeautifulSoup(fragment, "html.parser")
+				if key == "meta":
+					self._get_meta(soup)
+				elif key == "title":
+					self.title = self._get_title(soup)
+				elif key == "author":
+					self.author = self._get_author(soup)
+			return handler
+
+		def is_chapter(tag: str, attrs: dict[str, str]) -> bool:
+			# Chapters can't be told apart until the metadata has been read
+			if tag != "div" or "meta" not in preface:
+				return False
+			if self.is_single_chapter:
+				return attrs.get("id") == "chapters"
+			return has_class(attrs, "chapter") and re.fullmatch(r"chapter-\d+", attrs.get("id", "")) is not None
+
+		def add_chapter(fragment: str) -> None:
+			soup: BeautifulSoup = BeautifulSoup(fragment, "html.parser")
+			self._remove_landmarks(soup)
+			content: NavStr = soup.find("div")
+			if not isinstance(content, Tag):
+				return
+			if self.is_single_chapter:
+				self.chapter_list.append(Work.Chapter(self.title, content.prettify(), self._spill))
+				return
+			chapter: int = extract_int(str(content.get("id"))) or len(self.chapter_list) + 1
+			title_tag: NavStr = content.find("h3", class_="title")
+			title: Optional[str] = self._clean_chapter_title(title_tag.text, chapter) if title_tag is not None else None
+			self.chapter_list.append(self._build_chapter(content, chapter, title))
+
+		FragmentExtractor([
+			(first("meta", "dl", "work meta group"), keep("meta")),
+			(first("title", "h2", "heading"), keep("title")),
+			(first("author", "h3", "byline heading"), keep("author")),
+			(first("summary", "div", "summary module"), keep("summary")),
+			(is_chapter, add_chapter)
+		]).feed_file(page)
+
+		self._content = PackedText(BeautifulSoup("".join(preface.values()), "html.parser").prettify(), self._spill)
+
+	@property
+	def content(self) -> str:
+		"""
+		The page without its chapters, which are kept separately in `chapter_list`.
+		"""
+		return str(self._content)
 
 	def url(self) -> str:
-		return f"https://archiveofourown.org/works/{self.id}?view_full_work=true"
+		return f"{BASE_URL}/works/{self.id}?view_full_work=true"
 
 	def meta_title(self) -> str:
 		if self.series is None or len(self.series) == 0:
@@ -150,7 +281,9 @@ class Work:
 
 		index: int = chapter - 1
 		chapters: ResultSet[PageElement] = soup.find_all("h3", class_="title")
-		title: str = chapters[index].text.strip()
+		return self._clean_chapter_title(chapters[index].text, chapter)
+	def _clean_chapter_title(self, text: str, chapter: int) -> str | None:
+		title: str = text.strip()
 
 		if title == "":
 			return None
@@ -158,6 +291,22 @@ class Work:
 		title = title.replace(f"Chapter {chapter}:", "").strip()
 
 		return title
+	def _build_chapter(self, content: Tag, chapter: int, title: str | None) -> "Work.Chapter":
+		title_tag: Union[NavStr, int] = content.find("h3", class_="title")
+
+		if title is not None:
+			title = f"Chapter {chapter}: {title}"
+		else:
+			title = f"Chapter {chapter}"
+
+		if isinstance(title_tag, Tag):
+			title_tag.string = title
+
+		return Work.Chapter(title, content.prettify(), self._spill)
+	# Remove "chapter text" heading
+	def _remove_landmarks(self, soup: BeautifulSoup) -> None:
+		for heading in soup.find_all("h3", class_="landmark heading", id="work"):
+			heading.string = ""
 	def _get_chapter_content(self, soup: BeautifulSoup, chapter: int) -> NavStr:
 		tag: NavStr = None
 
@@ -189,6 +338,8 @@ class Work:
 
 	# Gets the number of entries in a given series
 	def _get_series_length(self, series_id: int) -> int:
+		if series_id in self._series_lengths:
+			return self._series_lengths[series_id]
 		if self.active_series is not None:
 			return self.active_series.length
 
@@ -199,7 +350,7 @@ class Work:
 
 		while not success and attempts <= MAX_ATTEMPTS:
 			try:
-				response = requests.get(f"https://archiveofourown.org/series/{series_id}", timeout=10)
+				response = requests.get(f"{BASE_URL}/series/{series_id}", timeout=10)
 				if response.status_code != 200:
 					attempts += 1
 					print(f"Unexpected error: {response.status_code}. Retrying {attempts}/{MAX_ATTEMPTS}.")
@@ -288,46 +439,158 @@ class Work:
 		self.released_chapters = latest_chapter
 		self.is_single_chapter = chapters == "1/1"
 
+class Blurb:
+	"""
+	Lightweight metadata for a work, read from its blurb on a series or user listing page.
+	Used to decide whether a work is worth a full fetch.
+	"""
+	__slots__ = ("id", "title", "author", "fandoms", "rating", "tags", "words", "chapters", "completed", "updated")
+
+	id: int
+	title: str
+	author: str
+	fandoms: list[str]
+	rating: str
+	tags: list[str]
+	words: int
+	chapters: str
+	completed: bool
+	updated: Optional[datetime]
+
+	def __init__(self, element: Tag):
+		work_id: Optional[int] = extract_int(str(element.get("id")).replace("work_", ""))
+		if work_id is None:
+			raise LookupError()
+		self.id = work_id
+
+		heading: NavStr = element.find("h4", class_="heading")
+		links: list[Tag] = heading.find_all("a") if isinstance(heading, Tag) else []
+		self.title = links[0].text.strip() if len(links) > 0 else "Unknown"
+		authors: list[str] = [x.text.strip() for x in links if x.get("rel") == ["author"]]
+		self.author = ", ".join(authors) if len(authors) > 0 else "Anonymous"
+
+		fandoms: NavStr = element.find("h5", class_="fandoms")
+		self.fandoms = [x.text.strip() for x in fandoms.find_all("a")] if isinstance(fandoms, Tag) else []
+
+		rating: NavStr = element.find("span", class_="rating")
+		self.rating = str(rating.get("title") or rating.text).strip() if isinstance(rating, Tag) else ""
+
+		tags: NavStr = element.find("ul", class_="tags")
+		self.tags = [x.text.strip() for x in tags.find_all("a")] if isinstance(tags, Tag) else []
+
+		words: NavStr = element.find("dd", class_="words")
+		self.words = (extract_int(words.text.replace(",", "")) or 0) if words is not None else 0
+
+		chapters: NavStr = element.find("dd", class_="chapters")
+		self.chapters = chapters.text.strip() if chapters is not None else ""
+		released: str = self.chapters.split("/")[0]
+		total: str = self.chapters.split("/")[-1]
+		self.completed = total.isdigit() and released == total
+
+		updated: NavStr = element.find("p", class_="datetime")
+		self.updated = datetime.strptime(updated.text.strip(), "%d %b %Y") if updated is not None else None
+
+	def estimated_bytes(self) -> int:
+		"""
+		Rough size of the full work page, for dry runs.
+		"""
+		return PAGE_OVERHEAD_BYTES + self.words * BYTES_PER_WORD
+
+	def estimated_pages(self) -> int:
+		"""
+		Rough number of printed pages, for dry runs. Includes the cover page.
+		"""
+		return 1 + -(-self.words // WORDS_PER_PAGE)
+
+@dataclass
+class Filter:
+	"""
+	Criteria a blurb has to meet before its work is fetched.
+	Fandoms and ratings match if any of the given values is contained in the blurb's, ignoring case.
+	"""
+	min_words: Optional[int] = None
+	fandoms: Optional[list[str]] = None
+	updated_since: Optional[datetime] = None
+	complete_only: bool = False
+	ratings: Optional[list[str]] = None
+
+	def matches(self, blurb: Blurb) -> bool:
+		if self.min_words is not None and blurb.words < self.min_words:
+			return False
+		if self.complete_only and not blurb.completed:
+			return False
+		if self.updated_since is not None and (blurb.updated is None or blurb.updated < self.updated_since):
+			return False
+		if self.fandoms is not None and not _contains_any(blurb.fandoms, self.fandoms):
+			return False
+		if self.ratings is not None and not _contains_any([blurb.rating], self.ratings):
+			return False
+		return True
+
+def _contains_any(values: list[str], wanted: list[str]) -> bool:
+	return any(x.lower() in value.lower() for value in values for x in wanted)
+
+# Listings are paginated, with a "next" link on every page but the last
+def _has_next_page(soup: BeautifulSoup) -> bool:
+	next_page: NavStr = soup.find("li", class_="next")
+	return isinstance(next_page, Tag) and next_page.find("a") is not None
+
 class Series:
-	works: list[Work]
+	blurbs: list[Blurb]
 	id: int
 
 	title: str
 
 	length: int
+	stream: bool
+	archive: Optional[Archive]
 
-	def __init__(self, series_id: int):
+	def __init__(self, series_id: int, stream: bool = False, filters: Optional[Filter] = None, archive: Optional[Archive] = None):
 		self.id = series_id
+		self.stream = stream
+		self.archive = archive
 
 		print(f"[INFO] Fetching series {series_id}")
 
-		attempts: int = 0
-		success: bool = False
+		self.blurbs = []
+		page: int = 1
+		more_pages: bool = True
+
+		# Works are listed 20 to a page, keep following the "next" link until it runs out
+		while more_pages:
+			attempts: int = 0
+			success: bool = False
+			more_pages = False
+
+			while not success and attempts <= MAX_ATTEMPTS:
+				try:
+					response = requests.get(self.url(), params={"page": page}, timeout=10)
+					if response.status_code != 200:
+						attempts += 1
+						print(f"Unexpected error: {response.status_code}. Retrying {attempts}/{MAX_ATTEMPTS}.")
+						continue
+					success = True
 
-		while not success and attempts <= MAX_ATTEMPTS:
-			try:
-				response = requests.get(self.url(), timeout=10)
-				if response.status_code != 200:
+					soup = BeautifulSoup(response.text, "html.parser")
+
+					if page == 1:
+						self.length = self._length(soup)
+						self.title = self._get_title(soup)
+					self._get_works(soup, filters)
+
+					if _has_next_page(soup):
+						more_pages = True
+						page += 1
+				except ReadTimeout:
+					if attempts >= MAX_ATTEMPTS:
+						break
 					attempts += 1
-					print(f"Unexpected error: {response.status_code}. Retrying {attempts}/{MAX_ATTEMPTS}.")
+					print(f"Connection timed out: Retrying {attempts}/{MAX_ATTEMPTS}.")
 					continue
-				success = True
 
-				soup = BeautifulSoup(response.text, "html.parser")
-
-				self.length = self._length(soup)
-				self.title = self._get_title(soup)
-				self._get_works(soup)
-			except ReadTimeout:
-				if attempts >= MAX_ATTEMPTS:
-					break
-				attempts += 1
-				print(f"Connection timed out: Retrying {attempts}/{MAX_ATTEMPTS}.")
-				continue
-
-		if not success or attempts > MAX_ATTEMPTS:
-			print("Failed to download. Try again.")
-			sys.exit(1)
+			if not success or attempts > MAX_ATTEMPTS:
+				print("Failed to download. Try again.")
+				sys.exit(1)
 
 	def url(self) -> str:
 		"""
@@ -335,18 +598,40 @@ class Series:
 		Returns:
 			str: "https://archiveofourown.org/series/{Series ID}"
 		"""
-		return f"https://archiveofourown.org/series/{self.id}"
+		return f"{BASE_URL}/series/{self.id}"
+
+	@property
+	def works(self) -> Iterator[Work]:
+		"""
+		Fetches the works that passed the filters, one at a time.
+		"""
+		for blurb in self.blurbs:
+			yield Work(blurb.id, self, stream=self.stream, archive=self.archive)
+
+	@classmethod
+	def offline(cls, series_id: int, title: str, length: int) -> "Series":
+		"""
+		A series known from an archive, without fetching its page.
+		"""
+		series: Series = cls.__new__(cls)
+		series.id = series_id
+		series.title = title
+		series.length = length
+		series.stream = False
+		series.archive = None
+		series.blurbs = []
+		return series
 
-	def _get_works(self, soup: BeautifulSoup) -> None:
-		self.works = []
+	def _get_works(self, soup: BeautifulSoup, filters: Optional[Filter]) -> None:
 		work_list: NavStr = soup.find("ul", class_="series work index group")
 		if not isinstance(work_list, Tag):
 			raise LookupError()
 		for li in work_list.find_all(recursive=False):
-			work_id: Optional[int] = extract_int(li.get("id").replace("work_", ""))
-			if work_id is None:
-				raise LookupError()
-			self.works.append(Work(work_id, self))
+			blurb: Blurb = Blurb(li)
+			if filters is not None and not filters.matches(blurb):
+				print(f"[INFO] Skipping '{blurb.title}'")
+				continue
+			self.blurbs.append(blurb)
 
 	def _get_title(self, soup: BeautifulSoup) -> str:
 		title_element: NavStr = soup.find("h2", class_="heading")
@@ -361,47 +646,68 @@ class Series:
 		return int(work_list.text)
 
 class User:
-	works: list[Work]
+	blurbs: list[Blurb]
 	username: str
+	stream: bool
+	archive: Optional[Archive]
 
-	def __init__(self, username: str):
+	def __init__(self, username: str, stream: bool = False, filters: Optional[Filter] = None, archive: Optional[Archive] = None):
 		self.username = username
-		self.works = []
+		self.stream = stream
+		self.archive = archive
+		self.blurbs = []
 
 		print(f"[INFO] Fetching works from {username}")
 
-		attempts: int = 0
-		success: bool = False
+		page: int = 1
+		more_pages: bool = True
+
+		# Works are listed 20 to a page, keep following the "next" link until it runs out
+		while more_pages:
+			attempts: int = 0
+			success: bool = False
+			more_pages = False
+
+			while not success and attempts <= MAX_ATTEMPTS:
+				try:
+					response = requests.get(self.url(), params={"page": page}, timeout=10)
+					if response.status_code != 200:
+						attempts += 1
+						print(f"Unexpected error: {response.status_code}. Retrying {attempts}/{MAX_ATTEMPTS}.")
+						continue
+					success = True
+					soup = BeautifulSoup(response.text, "html.parser")
 
-		while not success and attempts <= MAX_ATTEMPTS:
-			try:
-				response = requests.get(self.url(), timeout=10)
-				if response.status_code != 200:
+					self._get_works(soup, filters)
+
+					if _has_next_page(soup):
+						more_pages = True
+						page += 1
+				except ReadTimeout:
+					if attempts >= MAX_ATTEMPTS:
+						break
 					attempts += 1
-					print(f"Unexpected error: {response.status_code}. Retrying {attempts}/{MAX_ATTEMPTS}.")
+					print(f"Connection timed out: Retrying {attempts}/{MAX_ATTEMPTS}.")
 					continue
-				success = True
-				soup = BeautifulSoup(response.text, "html.parser")
 
-				work_list: NavStr = soup.find("ol", class_="work index group")
-				if work_list is None:
-					raise LookupError("'work index group' element not found")
-				if isinstance(work_list, Tag):
-					for li in work_list.find_all("li"):
-						user_id: Optional[int] = extract_int(li.get("id"))
-						if user_id is None:
-							continue
-						self.works.append(Work(user_id))
-			except ReadTimeout:
-				if attempts >= MAX_ATTEMPTS:
-					break
-				attempts += 1
-				print(f"Connection timed out: Retrying {attempts}/{MAX_ATTEMPTS}.")
-				continue
+			if not success or attempts > MAX_ATTEMPTS:
+				print("Failed to download. Try again.")
+				sys.exit(1)
 
-		if not success or attempts > MAX_ATTEMPTS:
-			print("Failed to download. Try again.")
-			sys.exit(1)
+	def _get_works(self, soup: BeautifulSoup, filters: Optional[Filter]) -> None:
+		work_list: NavStr = soup.find("ol", class_="work index group")
+		if work_list is None:
+			raise LookupError("'work index group' element not found")
+		if isinstance(work_list, Tag):
+			for li in work_list.find_all("li"):
+				user_id: Optional[int] = extract_int(li.get("id"))
+				if user_id is None:
+					continue
+				blurb: Blurb = Blurb(li)
+				if filters is not None and not filters.matches(blurb):
+					print(f"[INFO] Skipping '{blurb.title}'")
+					continue
+				self.blurbs.append(blurb)
 
 	def url(self) -> str:
 		"""
@@ -409,4 +715,12 @@ class User:
 		Returns:
 			str: "https://archiveofourown.org/users/{Username}/works"
 		"""
-		return f"https://archiveofourown.org/users/{self.username}/works"
+		return f"{BASE_URL}/users/{self.username}/works"
+
+	@property
+	def works(self) -> Iterator[Work]:
+		"""
+		Fetches the works that passed the filters, one at a time.
+		"""
+		for blurb in self.blurbs:
+			yield Work(blurb.id, stream=self.stream, archive=self.archive)
@@ -0,0 +1,74 @@
+
+import tempfile
+import zlib
+from typing import IO, Optional
+
+# Compressed text larger than this is written out to disk instead of being kept in memory
+SPILL_THRESHOLD: int = 64 * 1024
+COMPRESSION_LEVEL: int = 6
+
+class SpillFile:
+	"""
+	Append-only temporary file holding the text that was too large to keep in memory.
+	The file is only created on the first write, and is deleted once the last reference to it is gone.
+	"""
+	_file: Optional[IO[bytes]]
+
+	def __init__(self) -> None:
+		self._file = None
+
+	def write(self, data: bytes) -> int:
+		"""
+		Returns:
+			int: The offset the data was written at.
+		"""
+		if self._file is None:
+			self._file = tempfile.TemporaryFile() # pylint: disable=consider-using-with
+		offset: int = self._file.seek(0, 2)
+		self._file.write(data)
+		return offset
+
+	def read(self, offset: int, length: int) -> bytes:
+		if self._file is None:
+			raise LookupError("Nothing has been spilled")
+		self._file.seek(offset)
+		return self._file.read(length)
+
+	def close(self) -> None:
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+
+class PackedText:
+	"""
+	Text kept compressed, either in memory or in a spill file once it passes the threshold.
+	It's only decompressed when read.
+	"""
+	__slots__ = ("_data", "_spill", "_offset", "_length")
+
+	_data: Optional[bytes]
+	_spill: Optional[SpillFile]
+	_offset: int
+	_length: int
+
+	def __init__(self, text: str, spill: Optional[SpillFile] = None, threshold: int = SPILL_THRESHOLD):
+		data: bytes = zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+		self._length = len(data)
+		if spill is not None and len(data) > threshold:
+			self._data = None
+			self._spill = spill
+			self._offset = spill.write(data)
+		else:
+			self._data = data
+			self._spill = None
+			self._offset = 0
+
+	def __str__(self) -> str:
+		data: bytes
+		if self._data is not None:
+			data = self._data
+		elif self._spill is not None:
+			data = self._spill.read(self._offset, self._length)
+		else:
+			return ""
+		return zlib.decompress(data).decode("utf-8")
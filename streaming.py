@@ -0,0 +1,128 @@
+
+import codecs
+import tempfile
+from html.parser import HTMLParser
+from typing import Callable, IO, Optional, TypeAlias
+
+import requests
+
+CHUNK_SIZE: int = 64 * 1024
+# Past this size the spooled page is moved from memory to disk
+SPOOL_SIZE: int = 1024 * 1024
+
+VOID_ELEMENTS: frozenset[str] = frozenset([
+	"area", "base", "br", "col", "embed", "hr", "img", "input",
+	"link", "meta", "param", "source", "track", "wbr"
+])
+
+Attrs: TypeAlias = dict[str, str]
+Matcher: TypeAlias = Callable[[str, Attrs], bool]
+Handler: TypeAlias = Callable[[str], None]
+
+def has_class(attrs: Attrs, class_: str) -> bool:
+	"""
+	Mirrors BeautifulSoup's class matching: a single class matches any element carrying it,
+	a space separated list has to match the attribute exactly.
+	"""
+	value: str = attrs.get("class", "")
+	if " " in class_:
+		return value == class_
+	return class_ in value.split()
+
+def spool(response: requests.Response) -> IO[bytes]:
+	"""
+	Copies a streamed response into a temporary file in fixed-size chunks, so the raw page
+	never has to be held in memory as a whole.
+	Returns:
+		IO[bytes]: The spooled page, rewound to the start.
+	"""
+	file: IO[bytes] = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) # pylint: disable=consider-using-with
+	for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+		file.write(chunk)
+	response.close()
+	file.seek(0)
+	return file
+
+class FragmentExtractor(HTMLParser):
+	"""
+	Event based parser that hands off the raw markup of selected elements as soon as they close.
+
+	Each rule is a (matcher, handler) pair. When an element opens and a matcher accepts it, everything up to
+	the matching close tag is collected and passed to the handler, after which it is discarded.
+	Only one element is captured at a time; rules are not checked inside an active capture.
+	"""
+	rules: list[tuple[Matcher, Handler]]
+
+	_handler: Optional[Handler]
+	_buffer: list[str]
+	_open: list[str]
+
+	def __init__(self, rules: list[tuple[Matcher, Handler]]):
+		super().__init__(convert_charrefs=False)
+		self.rules = rules
+		self._handler = None
+		self._buffer = []
+		self._open = []
+
+	def feed_file(self, file: IO[bytes], encoding: str = "utf-8") -> None:
+		"""
+		Feeds a binary file through the parser one chunk at a time.
+		"""
+		decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+		while chunk := file.read(CHUNK_SIZE):
+			self.feed(decoder.decode(chunk))
+		self.feed(decoder.decode(b"", final=True))
+		self.close()
+
+	def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+		text: str = self.get_starttag_text() or ""
+		if self._handler is None:
+			attr_dict: Attrs = {key: value or "" for key, value in attrs}
+			for matcher, handler in self.rules:
+				if matcher(tag, attr_dict):
+					self._handler = handler
+					self._buffer = []
+					self._open = []
+					break
+			else:
+				return
+
+		self._buffer.append(text)
+		if tag not in VOID_ELEMENTS:
+			self._open.append(tag)
+
+	def handle_startendtag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+		if self._handler is not None:
+			self._buffer.append(self.get_starttag_text() or "")
+
+	def handle_endtag(self, tag: str) -> None:
+		if self._handler is None or tag in VOID_ELEMENTS:
+			return
+		self._buffer.append(f"</{tag}>")
+		# Stray close tags are kept but don't end the capture, unclosed ones are closed implicitly
+		if tag not in self._open:
+			return
+		while self._open.pop() != tag:
+			pass
+		if len(self._open) == 0:
+			handler: Handler = self._handler
+			fragment: str = "".join(self._buffer)
+			self._handler = None
+			self._buffer = []
+			handler(fragment)
+
+	def handle_data(self, data: str) -> None:
+		if self._handler is not None:
+			self._buffer.append(data)
+
+	def handle_entityref(self, name: str) -> None:
+		if self._handler is not None:
+			self._buffer.append(f"&{name};")
+
+	def handle_charref(self, name: str) -> None:
+		if self._handler is not None:
+			self._buffer.append(f"&#{name};")
+
+	def handle_comment(self, data: str) -> None:
+		if self._handler is not None:
+			self._buffer.append(f"<!--{data}-->")